@@ -1,82 +1,128 @@
-from math import ceil
 from pathlib import Path
 
-class CANMessage:
-    """Represents a message on the CAN bus."""
-    def __init__(self, data: list):
-        self.priority = int(data[0])
-        self.trans_time = float(data[1])
-        self.period = int(data[2])
-        
-    def display(self) -> None:
-        print(f"Priority: {self.priority:2d}, Trans Time: {self.trans_time:.3f}, Period: {self.period:4d}")
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # the NumPy kernel below runs unchanged without Numba
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# Times are handled as integer ticks of 1/TIME_SCALE so the ceilings are exact integer divisions.
+# A microsecond tick (of the time unit) is fine enough for bit times such as 0.00125.
+TIME_SCALE = 10**6
+
+def to_ticks(values) -> np.ndarray:
+    """Converts times to integer ticks, rejecting values finer than one tick."""
+    scaled = np.asarray(values, dtype=np.float64) * TIME_SCALE
+    ticks = np.rint(scaled).astype(np.int64)
+    if not np.allclose(scaled, ticks, rtol=0, atol=1e-6):
+        raise ValueError(f"times must be multiples of 1/{TIME_SCALE}")
+    return ticks
+
+@njit(cache=True)
+def _waiting_time_jit(Cs, Ts, n_hp, block_time, idx, tau):
+    """Fixed-point iteration for the waiting time of message idx in ticks (0 if non-schedulable).
+    The arrays must be sorted by priority, so the n_hp higher-priority messages form a prefix."""
+    Cs_hp = Cs[:n_hp]
+    Ts_hp = Ts[:n_hp]
+    waiting_time = block_time
+
+    while True:
+        interference = block_time + (Cs_hp * ((waiting_time + tau + Ts_hp - 1) // Ts_hp)).sum()
+        # Check schedulability: interference plus own transmission must not exceed period
+        if interference + Cs[idx] > Ts[idx]:
+            return 0
+        if waiting_time == interference:
+            return waiting_time
+        waiting_time = interference
 
 class CANBus:
-    """Represents the CAN bus with its scheduling logic."""
+    """Represents the CAN bus with its scheduling logic.
+    Message fields are stored column-wise in the prios, trans_times and periods arrays."""
     def __init__(self, tau: float):
         self.tau = tau
-        self.messages = []  # instance variable for storing CANMessage objects
+        self.prios = np.empty(0, dtype=np.int64)
+        self.trans_times = np.empty(0, dtype=np.float64)
+        self.periods = np.empty(0, dtype=np.int64)
+        self._refresh_arrays()
         
-    def add_message(self, msg: CANMessage) -> None:
-        self.messages.append(msg)
+    def add_message(self, priority: int, trans_time: float, period: int) -> None:
+        self.add_messages([priority], [trans_time], [period])
         
-    def add_messages(self, msgs: list) -> None:
-        self.messages.extend(msgs)
+    def add_messages(self, prios, trans_times, periods) -> None:
+        self.prios = np.concatenate((self.prios, np.asarray(prios, dtype=np.int64)))
+        self.trans_times = np.concatenate((self.trans_times, np.asarray(trans_times, dtype=np.float64)))
+        self.periods = np.concatenate((self.periods, np.asarray(periods, dtype=np.int64)))
+        self._refresh_arrays()
+
+    @property
+    def tau(self) -> float:
+        """Transmission time of one bit."""
+        return self._tau_time
+
+    @tau.setter
+    def tau(self, value: float) -> None:
+        self._tau_time = value
+        self._tau = int(to_ticks(value))
+
+    def _refresh_arrays(self) -> None:
+        """Derives the priority-sorted tick arrays used by the jitted kernel."""
+        order = np.argsort(self.prios, kind='stable')
+        self._sorted_prios = self.prios[order]
+        self._sorted_Cs = to_ticks(self.trans_times)[order]
+        self._sorted_Ts = to_ticks(self.periods)[order]
+        # position of each message (in insertion order) within the sorted arrays
+        self._rank = np.empty_like(order)
+        self._rank[order] = np.arange(len(order))
+        # number of strictly higher-priority messages per position, i.e. the length
+        # of the sorted prefix that interferes with it
+        self._hp_len = np.searchsorted(self._sorted_prios, self._sorted_prios)
+        # blocking time per position: max trans_time over messages with lower or equal
+        # priority, i.e. a suffix max taken from the first message of each priority level
+        suffix_max = np.maximum.accumulate(self._sorted_Cs[::-1])[::-1]
+        self._blocks = suffix_max[self._hp_len]
         
     def get_max_blocking_time(self, index: int) -> float:
-        current_priority = self.messages[index].priority
-        # Find the maximum transmission time among messages with lower or equal priority
-        return max((msg.trans_time for msg in self.messages if msg.priority >= current_priority), default=0)
+        # Maximum transmission time among messages with lower or equal priority
+        return int(self._blocks[self._rank[index]]) / TIME_SCALE
+
+    def _waiting_ticks(self, index: int) -> int:
+        pos = self._rank[index]
+        return int(_waiting_time_jit(self._sorted_Cs, self._sorted_Ts, self._hp_len[pos], self._blocks[pos],
+                                     pos, self._tau))
     
     def compute_waiting_time(self, index: int) -> float:
-        msg = self.messages[index]
-        current_priority = msg.priority
-        block_time = self.get_max_blocking_time(index)
-        waiting_time = block_time
-        
-        while True:
-            interference = block_time
-            for m in self.messages:
-                if m.priority < current_priority:
-                    interference += m.trans_time * ceil((waiting_time + self.tau) / m.period)
-            # Check schedulability: interference plus own transmission must not exceed period
-            if interference + msg.trans_time > msg.period:
-                return 0
-            if waiting_time == interference:
-                return waiting_time
-            waiting_time = interference
+        return self._waiting_ticks(index) / TIME_SCALE
     
     def compute_worst_case_response_time(self, index: int) -> float:
-        waiting_time = self.compute_waiting_time(index)
-        if waiting_time == 0:
+        waiting_ticks = self._waiting_ticks(index)
+        if waiting_ticks == 0:
             print("ERROR: non-schedulable")
             return -1
-        response_time = waiting_time + self.messages[index].trans_time
+        response_time = (waiting_ticks + int(self._sorted_Cs[self._rank[index]])) / TIME_SCALE
         print(response_time)
         return response_time
     
     def display(self) -> None:
         print("tau =", self.tau)
-        for msg in self.messages:
-            msg.display()
+        for p, c, t in zip(self.prios, self.trans_times, self.periods):
+            print(f"Priority: {p:2d}, Trans Time: {c:.3f}, Period: {t:4d}")
 
 def load_data(filename: Path, debug: bool = False):
     """Reads CAN message data from a file and returns a CANBus instance and message count."""
     with open(filename, 'r') as file:
         num_messages = int(file.readline().strip())
         tau = float(file.readline().strip())
-        bus = CANBus(tau)
-        message_list = []
-        for _ in range(num_messages):
-            line = file.readline().strip()
-            parts = line.split()
-            bus.add_message(CANMessage(parts))
-            message_list.append(parts)
+    messages = np.loadtxt(filename, skiprows=2, max_rows=num_messages, ndmin=1,
+                          dtype=[('priority', 'i8'), ('trans_time', 'f8'), ('period', 'i8')])
+    bus = CANBus(tau)
+    bus.add_messages(messages['priority'], messages['trans_time'], messages['period'])
             
     if debug:
         print("Number of messages:", num_messages)
         print("tau:", tau)
-        print("Message list:", message_list)
+        print("Message list:", messages.tolist())
     return bus, num_messages
 
 DEBUG_MODE = False
@@ -0,0 +1,28 @@
+# cython: language_level=3
+"""Native fallback for the WCRT fixed-point kernel of main.py, used when Numba is
+not installed. Build in place with: python setup.py build_ext --inplace"""
+cimport cython
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+@cython.cdivision(True)
+cpdef long long waiting_time_c(const long long[:] Cs, const long long[:] Ts, long long n_hp,
+                               long long block, long long C, long long T, long long tau):
+    """Same contract as main._waiting_time_jit: waiting time in ticks of a message with
+    transmission time C and period T, whose higher-priority messages are the first n_hp
+    entries of Cs/Ts. Returns 0 if the message is not schedulable."""
+    cdef long long limit = T - C
+    cdef long long wt, rhs
+    cdef Py_ssize_t k
+    if block > limit:
+        return 0
+    wt = block
+    while True:
+        rhs = block
+        for k in range(n_hp):
+            rhs += Cs[k] * ((wt + tau + Ts[k] - 1) // Ts[k])
+            if rhs > limit:
+                return 0
+        if wt == rhs:
+            return wt
+        wt = rhs
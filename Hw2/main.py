@@ -1,61 +1,194 @@
-import random
-from math import ceil, exp
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil, log
 from pathlib import Path
 import inspect
+import os
 
-class Message:
-    """Represents a CAN message with its priority, transmission time, and period."""
-    def __init__(self, data: list):
-        # data is expected to be a list: [priority, trans_time, period]
-        self.priority = int(data[0])
-        self.trans_time = float(data[1])
-        self.period = int(data[2])
-    
-    def display(self) -> None:
-        print(f"priority = {self.priority:2d}, trans_time = {self.trans_time:.3f}, period = {self.period:4d}.")
+import numpy as np
+
+try:
+    from numba import njit
+    HAVE_NUMBA = True
+except ImportError:  # the kernels below then run as plain Python functions
+    HAVE_NUMBA = False
+
+    def njit(*args, **kwargs):
+        return lambda func: func
+
+# Times are kept as integer ticks of 1/TIME_SCALE so the ceilings in the
+# fixed-point iteration are exact integer divisions. A microsecond tick (of the
+# time unit) is fine enough for bit times such as 0.00125.
+TIME_SCALE = 10**6
+
+def to_ticks(values) -> np.ndarray:
+    """Converts times to integer ticks. Raises ValueError for values finer than one tick."""
+    scaled = np.asarray(values, dtype=np.float64) * TIME_SCALE
+    ticks = np.rint(scaled).astype(np.int64)
+    if not np.allclose(scaled, ticks, rtol=0, atol=1e-6):
+        raise ValueError(f"times must be multiples of 1/{TIME_SCALE}")
+    return ticks
+
+@njit(cache=True)
+def _waiting_time_jit(Cs, Ts, n_hp, block, C, T, tau):
+    """Iterative waiting time (in ticks) of a message with transmission time C and
+    period T. Cs/Ts are sorted by priority so that its higher-priority messages are
+    exactly the first n_hp entries. Returns 0 if the message is not schedulable."""
+    limit = T - C  # schedulable only while rhs + C <= T
+    if block > limit:
+        return 0
+    wt = block
+    while True:
+        rhs = block
+        for k in range(n_hp):
+            rhs += Cs[k] * ((wt + tau + Ts[k] - 1) // Ts[k])
+            # rhs only grows, so bail out as soon as the bound is exceeded
+            if rhs > limit:
+                return 0
+        if wt == rhs:
+            return wt
+        wt = rhs
+
+if not HAVE_NUMBA:
+    # Prefer the compiled Cython kernel (see setup.py) over the pure-Python loop;
+    # the other kernels look _waiting_time_jit up at call time and pick it up.
+    try:
+        from _wcrt_kernel import waiting_time_c as _waiting_time_jit
+    except ImportError:
+        pass
+
+@njit(cache=True)
+def _total_wcrt_jit(sorted_Cs, sorted_Ts, hp_len, blocks, Cs, Ts, tau):
+    """Total WCRT ticks over all schedulable messages and the number of
+    unschedulable ones, accumulated in a single pass."""
+    total = 0
+    non_sched = 0
+    for i in range(Cs.shape[0]):
+        wt = _waiting_time_jit(sorted_Cs, sorted_Ts, hp_len[i], blocks[i], Cs[i], Ts[i], tau)
+        if wt == 0:
+            non_sched += 1
+        else:
+            total += wt + Cs[i]
+    return total, non_sched
+
+@njit(cache=True)
+def _swap_wcrts_jit(prios, Cs, Ts, tau, wcrts, pairs):
+    """WCRT ticks (-1 if not schedulable) of every message for each candidate swap
+    (i, j) in pairs. wcrts holds the WCRTs under prios and is reused for messages
+    whose priority lies outside the two swapped levels. Returns a (B, N) array."""
+    n = prios.shape[0]
+    order = np.argsort(prios, kind='mergesort')
+    sorted_prios = prios[order]
+    rank = np.empty(n, dtype=np.int64)
+    rank[order] = np.arange(n)
+    suffix_max = np.empty(n + 1, dtype=np.int64)
+    suffix_max[n] = 0
+    # Scratch copies that each candidate swaps in place and restores afterwards.
+    swapped = prios.copy()
+    sorted_Cs = Cs[order]
+    sorted_Ts = Ts[order]
+    out = np.empty((pairs.shape[0], n), dtype=np.int64)
+    for b in range(pairs.shape[0]):
+        i, j = pairs[b, 0], pairs[b, 1]
+        ri, rj = rank[i], rank[j]
+        swapped[i], swapped[j] = prios[j], prios[i]
+        # Swapping two priorities leaves the sorted priority values unchanged and
+        # just exchanges the two messages' places in the sorted order.
+        sorted_Cs[ri], sorted_Cs[rj] = Cs[j], Cs[i]
+        sorted_Ts[ri], sorted_Ts[rj] = Ts[j], Ts[i]
+        for k in range(n - 1, -1, -1):
+            suffix_max[k] = max(suffix_max[k + 1], sorted_Cs[k])
+        lo, hi = min(prios[i], prios[j]), max(prios[i], prios[j])
+        for k in range(n):
+            p = swapped[k]
+            if p < lo or p > hi:
+                out[b, k] = wcrts[k]
+                continue
+            n_hp = np.searchsorted(sorted_prios, p)
+            wt = _waiting_time_jit(sorted_Cs, sorted_Ts, n_hp, suffix_max[n_hp], Cs[k], Ts[k], tau)
+            out[b, k] = wt + Cs[k] if wt > 0 else -1
+        swapped[i], swapped[j] = prios[i], prios[j]
+        sorted_Cs[ri], sorted_Cs[rj] = Cs[i], Cs[j]
+        sorted_Ts[ri], sorted_Ts[rj] = Ts[i], Ts[j]
+    return out
 
 class CANController:
-    """Handles scheduling of CAN messages."""
+    """Handles scheduling of CAN messages. Message fields are stored column-wise:
+    prios, trans_times and periods hold one entry per message."""
     def __init__(self, tau: float):
-        self.tau = tau  # transmission time of one bit
-        self.messages = []  # list of Message objects
+        self.tau = tau
+        self.prios = np.empty(0, dtype=np.int64)
+        self.trans_times = np.empty(0, dtype=np.float64)
+        self.periods = np.empty(0, dtype=np.int64)
+        self._refresh_arrays()
+
+    def add_message(self, priority: int, trans_time: float, period: int) -> None:
+        self.add_messages([priority], [trans_time], [period])
+
+    def add_messages(self, prios, trans_times, periods) -> None:
+        self.prios = np.concatenate((self.prios, np.asarray(prios, dtype=np.int64)))
+        self.trans_times = np.concatenate((self.trans_times, np.asarray(trans_times, dtype=np.float64)))
+        self.periods = np.concatenate((self.periods, np.asarray(periods, dtype=np.int64)))
+        self._refresh_arrays()
+
+    @property
+    def tau(self) -> float:
+        """Transmission time of one bit."""
+        return self._tau_time
+
+    @tau.setter
+    def tau(self, value: float) -> None:
+        self._tau_time = value
+        self._tau = int(to_ticks(value))
+
+    def _refresh_arrays(self) -> None:
+        """Derives the tick-valued and priority-sorted arrays used by the jitted kernels."""
+        self._Cs = to_ticks(self.trans_times)
+        self._Ts = to_ticks(self.periods)
+        self._refresh_order()
 
-    def add_message(self, msg: Message) -> None:
-        self.messages.append(msg)
+    def _refresh_order(self, order: np.ndarray = None) -> None:
+        """Rebuilds the arrays that depend on the priorities; order is the stable
+        argsort of prios and is computed if not given."""
+        if order is None:
+            order = np.argsort(self.prios, kind='stable')
+        # Priority-sorted copies: the higher-priority messages of message i are the
+        # first _hp_len[i] entries of _sorted_Cs/_sorted_Ts.
+        sorted_prios = self.prios[order]
+        self._sorted_Cs = self._Cs[order]
+        self._sorted_Ts = self._Ts[order]
+        self._hp_len = np.searchsorted(sorted_prios, self.prios)
+        # Longest blocking per message: suffix max of trans_time over the sorted
+        # messages, looked up at the first message of each priority level.
+        suffix_max = np.maximum.accumulate(self._sorted_Cs[::-1])[::-1]
+        self._blocks = suffix_max[self._hp_len]
     
     def get_longest_blocking(self, idx: int) -> float:
         """Returns the largest transmission time among messages whose priority is
         greater than or equal to that of the message at index idx."""
-        current_priority = self.messages[idx].priority
-        return max((m.trans_time for m in self.messages if m.priority >= current_priority), default=0)
+        return int(self._blocks[idx]) / TIME_SCALE
     
     def get_waiting_time(self, idx: int) -> float:
         """Computes the waiting time for message at idx using an iterative method.
         Returns 0 if the message is not schedulable."""
-        msg = self.messages[idx]
-        current_priority = msg.priority
-        block = self.get_longest_blocking(idx)
-        wt = block
-        while True:
-            rhs = block
-            for m in self.messages:
-                if m.priority < current_priority:
-                    rhs += m.trans_time * ceil((wt + self.tau) / m.period)
-            if rhs + msg.trans_time > msg.period:
-                return 0
-            if abs(wt - rhs) < 1e-9:  # convergence check
-                return wt
-            wt = rhs
+        return self._waiting_ticks(idx) / TIME_SCALE
+
+    def _waiting_ticks(self, idx: int) -> int:
+        return int(_waiting_time_jit(self._sorted_Cs, self._sorted_Ts, self._hp_len[idx], self._blocks[idx],
+                                     self._Cs[idx], self._Ts[idx], self._tau))
+
+    def _wcrt_ticks(self, idx: int) -> int:
+        wt = self._waiting_ticks(idx)
+        return wt + int(self._Cs[idx]) if wt > 0 else -1
 
     def compute_single_wcrt(self, idx: int, do_print: bool = False) -> float:
         """Computes and (optionally) prints the worst-case response time for one message.
         Returns -1 if not schedulable."""
-        wt = self.get_waiting_time(idx)
-        if wt == 0:
+        wcrt = self._wcrt_ticks(idx)
+        if wcrt < 0:
             if do_print:
                 print("ERROR: non-schedulable")
             return -1
-        wcrt = wt + self.messages[idx].trans_time
+        wcrt /= TIME_SCALE
         if do_print:
             print(wcrt)
         return wcrt
@@ -64,25 +197,20 @@ class CANController:
         """Prints the worst-case response time for each message (one per line)
         and then prints the total cost (objective value)."""
         total, non_sched = 0, 0
-        for i in range(len(self.messages)):
-            rt = self.compute_single_wcrt(i, do_print=True)
-            if rt < 0:
+        for i in range(len(self.prios)):
+            if self.compute_single_wcrt(i, do_print=True) < 0:
                 non_sched += 1
             else:
-                total += rt
+                total += self._wcrt_ticks(i)
+        total /= TIME_SCALE  # summed in ticks so the printed total is exact
         print(total)
         return total, non_sched
 
     def compute_total_wcrt(self) -> tuple:
         """Returns the total worst-case response time and the count of unschedulable messages."""
-        total, non_sched = 0, 0
-        for i in range(len(self.messages)):
-            rt = self.compute_single_wcrt(i)
-            if rt < 0:
-                non_sched += 1
-            else:
-                total += rt
-        return total, non_sched
+        total, non_sched = _total_wcrt_jit(self._sorted_Cs, self._sorted_Ts, self._hp_len, self._blocks,
+                                           self._Cs, self._Ts, self._tau)
+        return total / TIME_SCALE, int(non_sched)
 
     def get_cost(self, seq: list[int] = None, penalty: int = 0, do_print: bool = False) -> tuple:
         """If a sequence is provided, updates the message priorities accordingly.
@@ -95,20 +223,49 @@ class CANController:
             print(cost)
         return cost, (non_sched == 0)
 
+    def get_wcrts(self, seq: list[int] = None) -> np.ndarray:
+        """If a sequence is provided, updates the message priorities accordingly.
+        Returns the worst-case response time of every message in ticks (-1 if not schedulable)."""
+        if seq is not None:
+            self.update_priorities(seq)
+        return np.array([self._wcrt_ticks(i) for i in range(len(self.prios))], dtype=np.int64)
+
+    def get_swap_costs(self, seq: list[int], pairs: np.ndarray, wcrts: np.ndarray, penalty: int = 0) -> tuple:
+        """Evaluates a batch of candidate swaps of seq in one jitted call. pairs is a
+        (B, 2) array of positions and wcrts the per-message WCRT ticks of seq. Only
+        messages whose priority lies between the two swapped levels see a different
+        interference/blocking set, so only those are recomputed.
+        Returns (costs, feasible, wcrts) with one entry/row per candidate."""
+        batch_wcrts = _swap_wcrts_jit(np.asarray(seq, dtype=np.int64), self._Cs, self._Ts,
+                                      self._tau, wcrts, pairs)
+        costs, feasible = self.cost_from_wcrts(batch_wcrts, penalty)
+        return costs, feasible, batch_wcrts
+
+    @staticmethod
+    def cost_from_wcrts(wcrts: np.ndarray, penalty: int = 0) -> tuple:
+        """Total WCRT plus penalty for each unschedulable (-1) entry, taken over the
+        last axis of wcrts (WCRT ticks as returned by get_wcrts)."""
+        non_sched = (wcrts < 0).sum(axis=-1)
+        cost = np.where(wcrts >= 0, wcrts, 0).sum(axis=-1) / TIME_SCALE + non_sched * penalty
+        return cost, (non_sched == 0)
+
     def update_priorities(self, seq: list[int]) -> None:
         """Updates each message’s priority using the given sequence."""
-        for msg, p in zip(self.messages, seq):
-            msg.priority = p
+        self.prios = np.array(seq, dtype=np.int64)
+        self._refresh_order()
 
     def sort_messages(self) -> None:
         """Sorts messages by their priority (ascending)."""
-        self.messages.sort(key=lambda m: m.priority)
+        order = np.argsort(self.prios, kind='stable')
+        self.prios, self.trans_times, self.periods = self.prios[order], self.trans_times[order], self.periods[order]
+        self._Cs, self._Ts = self._Cs[order], self._Ts[order]
+        self._refresh_order(np.arange(len(order)))  # already sorted
 
     def display(self) -> None:
         """Prints the tau value and details for all messages."""
         print("tau =", self.tau)
-        for m in self.messages:
-            m.display()
+        for p, c, t in zip(self.prios, self.trans_times, self.periods):
+            print(f"priority = {p:2d}, trans_time = {c:.3f}, period = {t:4d}.")
 
 def load_data(filepath: Path, debug: bool = False) -> tuple:
     """
@@ -121,16 +278,14 @@ def load_data(filepath: Path, debug: bool = False) -> tuple:
     with open(filepath, 'r') as f:
         num = int(f.readline().strip())
         tau = float(f.readline().strip())
-        controller = CANController(tau)
-        comp_list = []
-        for _ in range(num):
-            parts = f.readline().strip().split()
-            comp_list.append(parts)
-            controller.add_message(Message(parts))
+    comps = np.loadtxt(filepath, skiprows=2, max_rows=num, ndmin=1,
+                       dtype=[('priority', 'i8'), ('trans_time', 'f8'), ('period', 'i8')])
+    controller = CANController(tau)
+    controller.add_messages(comps['priority'], comps['trans_time'], comps['period'])
     if debug:
         print("num =", num)
         print("tau =", tau)
-        print("comp_list =", comp_list)
+        print("comp_list =", comps.tolist())
     return controller, num
 
 def swap_list(seq: list, i: int, j: int) -> list:
@@ -139,49 +294,90 @@ def swap_list(seq: list, i: int, j: int) -> list:
     new_seq[i], new_seq[j] = new_seq[j], new_seq[i]
     return new_seq
 
-def simulated_annealing(controller: CANController, n: int, T_start: float, T_end: float, cooling: float) -> list[int]:
-    """Performs a simulated annealing search to (greedily) improve the cost.
-    Prints progress messages similar to the original."""
-    print("CAN SA starting...")
-    print(f"SA | Temp start: {T_start}, frozen: {T_end}, ratio: {cooling}")
-    constant = 100000
+def cooling_schedule(T_start: float, T_end: float, cooling: float) -> np.ndarray:
+    """Returns the temperatures T_start * cooling**k that stay above T_end."""
+    steps = max(0, ceil(log(T_end / T_start) / log(cooling)))
+    return T_start * cooling ** np.arange(steps)
+
+def simulated_annealing(controller: CANController, n: int, T_start: float, T_end: float, cooling: float,
+                        batch: int = 32, seed=None) -> tuple[list[int], float]:
+    """Performs a simulated annealing search to improve the cost.
+    At every temperature a batch of random swaps is evaluated at once; the first
+    accepted candidate becomes the current sequence.
+    seed is passed to np.random.default_rng(). Returns the best sequence and its cost."""
     penalty = 150
-    T = T_start
-    current_seq = [m.priority for m in controller.messages]
+    current_seq = controller.prios.tolist()
     best_seq = current_seq.copy()
+    # Costs of current_seq and best_seq only change when those sequences are
+    # replaced. The per-message WCRTs of current_seq are kept so a swap only
+    # recomputes the messages it can affect.
+    wcrts_current = controller.get_wcrts(seq=current_seq)
+    cost_current, _ = controller.cost_from_wcrts(wcrts_current, penalty)
+    cost_best = cost_current
+    # All random numbers of the run are drawn up front: swap positions i != j
+    # (j is drawn from n - 1 values and shifted past i) and log(u) of the
+    # acceptance draws, u in (0, 1].
+    temperatures = cooling_schedule(T_start, T_end, cooling)
+    steps = len(temperatures)
+    rng = np.random.default_rng(seed)
+    swap_i = rng.integers(0, n, size=(steps, batch))
+    swap_j = rng.integers(0, n - 1, size=(steps, batch))
+    swap_j += swap_j >= swap_i
+    all_pairs = np.stack((swap_i, swap_j), axis=-1)
+    all_log_u = np.log1p(-rng.random((steps, batch)))
     
-    while T > T_end:
-        i, j = random.sample(range(n), 2)
-        candidate = swap_list(current_seq, i, j)
-        cost_current, _ = controller.get_cost(seq=current_seq, penalty=penalty)
-        cost_candidate, feasible = controller.get_cost(seq=candidate, penalty=penalty)
-        cost_best, _ = controller.get_cost(seq=best_seq, penalty=penalty)
-        print(f"\rcost | s*: {cost_best}", end='')
-        diff = cost_candidate - cost_current
-        if feasible and cost_candidate < cost_best:
-            best_seq = candidate.copy()
-        if diff <= 0:
-            current_seq = candidate.copy()
-        else:
-            prob = random.uniform(0, 1)
-            if constant * prob < prob * exp(-diff / T):
-                current_seq = candidate.copy()
-        T *= cooling
-    print()
-    print("CAN SA was done")
-    if not controller.get_cost(seq=best_seq)[1]:
-        print("ERROR: non-schedulable, potential fail in SA.")
-    print()
-    return best_seq
+    for step, T in enumerate(temperatures):
+        pairs = all_pairs[step]
+        costs, feasible, batch_wcrts = controller.get_swap_costs(current_seq, pairs, wcrts_current, penalty)
+        # best feasible candidate of the batch
+        feasible_costs = np.where(feasible, costs, np.inf)
+        b = int(np.argmin(feasible_costs))
+        if feasible_costs[b] < cost_best:
+            best_seq = swap_list(current_seq, *pairs[b])
+            cost_best = costs[b]
+        # first candidate of the batch that passes the Metropolis test u < exp(-diff / T)
+        diffs = costs - cost_current
+        accepted = (diffs <= 0) | (T * all_log_u[step] < -diffs)
+        if accepted.any():
+            b = int(np.argmax(accepted))
+            i, j = pairs[b]
+            current_seq[i], current_seq[j] = current_seq[j], current_seq[i]
+            cost_current, wcrts_current = costs[b], batch_wcrts[b]
+    return best_seq, float(cost_best)
+
+def _annealing_restart(controller: CANController, T_start: float, T_end: float, cooling: float,
+                       seed) -> tuple[list[int], float]:
+    """Runs one SA chain in a worker process (on its own copy of controller)."""
+    return simulated_annealing(controller, len(controller.prios), T_start, T_end, cooling, seed=seed)
+
+def parallel_annealing(controller: CANController, T_start: float, T_end: float, cooling: float,
+                       restarts: int | None = None, seed=None) -> tuple[list[int], float]:
+    """Runs independent SA chains (one per CPU by default) in separate processes
+    and returns the best sequence and cost found by any of them. Every chain
+    draws from its own child of np.random.SeedSequence(seed)."""
+    restarts = restarts or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(seed).spawn(restarts)
+    with ProcessPoolExecutor(max_workers=restarts) as pool:
+        results = list(pool.map(_annealing_restart, [controller] * restarts, [T_start] * restarts,
+                                [T_end] * restarts, [cooling] * restarts, seeds))
+    return min(results, key=lambda result: result[1])
 
 def main():
-    controller, n = load_data(Path('input.dat'), debug=False)
+    controller, _ = load_data(Path('input.dat'), debug=False)
     # Print the original cost (objective value)
     orig_cost, _ = controller.get_cost()
     print("original cost:", orig_cost)
     
-    # Run simulated annealing to search for a better priority assignment
-    best_sequence = simulated_annealing(controller, n, 2, 1, 0.999)
+    # Run simulated annealing restarts in parallel to search for a better priority assignment
+    T_start, T_end, cooling = 2, 1, 0.999
+    print("CAN SA starting...")
+    print(f"SA | Temp start: {T_start}, frozen: {T_end}, ratio: {cooling}")
+    best_sequence, best_cost = parallel_annealing(controller, T_start, T_end, cooling)
+    print(f"cost | s*: {best_cost}")
+    print("CAN SA was done")
+    if not controller.get_cost(seq=best_sequence)[1]:
+        print("ERROR: non-schedulable, potential fail in SA.")
+    print()
     
     # Update priorities to the best found solution and sort messages accordingly
     controller.update_priorities(best_sequence)